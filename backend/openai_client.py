@@ -1,18 +1,63 @@
-import json
+import asyncio
 import os
-from typing import Dict, List
-from typing import Any, Dict
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Final, List, Mapping, Optional, Tuple
 
+import orjson
 from fastapi import HTTPException
 from openai import AsyncOpenAI
 
 MODEL_NAME = os.getenv("OPENAI_MODEL", "gpt-5.1-mini")
+FOOD_MODEL_NAME = os.getenv("OPENAI_FOOD_MODEL", "gpt-5.1")
 API_KEY = os.getenv("OPENAI_API_KEY")
 client = AsyncOpenAI(api_key=API_KEY) if API_KEY else None
+OPENAI_READY: Final[bool] = client is not None
 
+INGREDIENT_CACHE_TTL_SECONDS = float(os.getenv("INGREDIENT_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+INGREDIENT_CACHE_MAX_ENTRIES = 1024
+INGREDIENT_CACHE_FILE = os.getenv(
+    "INGREDIENT_CACHE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingredient_cache.json")
+)
+INGREDIENT_CACHE_FILE_CHECK_SECONDS = 60.0
 
-def is_openai_configured() -> bool:
-    return client is not None
+INGREDIENT_SUMMARY_MAX_TOKENS = 80
+PRODUCT_SUMMARY_MAX_TOKENS = 120
+# Reasoning models (GPT-5, o-series) count hidden reasoning tokens against the output cap.
+REASONING_TOKEN_ALLOWANCE = int(os.getenv("OPENAI_REASONING_TOKEN_ALLOWANCE", "1024"))
+_REASONING_MODEL_PREFIXES = ("gpt-5", "o1", "o3", "o4")
+
+_INGREDIENT_SYSTEM_MESSAGE: Final[Dict[str, str]] = {
+    "role": "system",
+    "content": (
+        "Cosmetics ingredient assistant. Concise, neutral, non-medical; no medical advice. "
+        "Input: INCI|function|origin|risk level|concerns. "
+        'Reply JSON {"summary": str}.'
+    ),
+}
+_PRODUCT_SYSTEM_MESSAGE: Final[Dict[str, str]] = {
+    "role": "system",
+    "content": (
+        "Cosmetics suitability assessor. Conservative, neutral; no medical or dermatological advice. "
+        "Input: product name, then comma-separated INCI names. "
+        'Reply JSON {"overallScore": "A"|"B"|"C"|"D", "overallSummary": 1-2 sentences}.'
+    ),
+}
+_PRODUCT_FULL_SYSTEM_MESSAGE: Final[Dict[str, str]] = {
+    "role": "system",
+    "content": (
+        "Cosmetics ingredient assistant. Concise, neutral, non-medical; no medical advice. "
+        "Input: product name, then one INCI|function|origin|risk level|concerns row per ingredient, "
+        'optionally followed by a "Score only:" line of INCI names that count toward the score but need no summary. '
+        'Reply JSON {"ingredients": [{"inciName": str, "summary": str}] (one per row), '
+        '"overallScore": "A"|"B"|"C"|"D", "overallSummary": 1-2 sentences}.'
+    ),
+}
+
+_ingredient_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_ingredient_locks: Dict[str, asyncio.Lock] = {}
+_cache_file_mtime: Optional[float] = None
+_cache_file_checked_at = float("-inf")
 
 
 def _require_client():
@@ -20,109 +65,182 @@ def _require_client():
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY is not configured.")
 
 
-async def summarize_ingredient(inci_name: str, base_info: Dict[str, object]) -> str:
-    _require_client()
-    concerns = base_info.get("concerns", [])
-    concerns_text = "; ".join(str(item) for item in concerns) if concerns else "No specific concerns noted."
-MODEL_NAME = os.getenv("OPENAI_MODEL", "gpt-5.1")
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def token_limit_params(max_tokens: int, model: str = MODEL_NAME) -> Dict[str, int]:
+    """Request-body fields capping a completion at roughly max_tokens of visible output."""
+    if model.startswith(_REASONING_MODEL_PREFIXES):
+        return {"max_completion_tokens": max_tokens + REASONING_TOKEN_ALLOWANCE}
+    return {"max_tokens": max_tokens}
 
 
-async def analyze_ingredients_with_openai(ingredients_text: str, product_name: str) -> Dict[str, Any]:
-    if not client.api_key:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY is not configured.")
-
-    system_prompt = (
-        "You are a food safety assistant. Given ingredient text, break it into individual ingredients, "
-        "assess risk (low/medium/high) for common allergies and health concerns, and return a concise JSON response."
+async def _stream_completion(messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+    """Stream a JSON-mode completion, returning as soon as the accumulated text parses."""
+    stream = await client.chat.completions.create(
+        model=MODEL_NAME,
+        response_format={"type": "json_object"},
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        # openai==1.35.5 predates max_completion_tokens, so the cap is sent as raw body fields.
+        extra_body=token_limit_params(max_tokens),
     )
+    parts: List[str] = []
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            if delta.rstrip().endswith("}"):
+                try:
+                    orjson.loads("".join(parts))
+                except orjson.JSONDecodeError:
+                    continue
+                break
+    finally:
+        await stream.close()
+    return "".join(parts)
 
-    user_prompt = (
-        "Analyze the following ingredients and respond strictly as JSON.\n"
-        f"Product name: {product_name}\n"
-        f"Ingredients: {ingredients_text}\n"
-        "Return fields: productName (string), ingredients (array of objects with name, risk (low|medium|high), details), "
-        "and overallScore (single letter like A/B/C/D)."
+
+def _ingredient_row(base_info: Mapping[str, object]) -> str:
+    concerns = base_info.get("concerns", [])
+    concerns_text = "; ".join(str(item) for item in concerns) if concerns else "none"
+    return (
+        f"{base_info.get('inci_name', 'unknown')}|{base_info.get('function', 'unknown')}|"
+        f"{base_info.get('origin') or '?'}|{base_info.get('risk_level', 'unknown')}|{concerns_text}"
     )
 
+
+def ingredient_summary_messages(inci_name: str, base_info: Mapping[str, object]) -> List[Dict[str, str]]:
+    return [
+        _INGREDIENT_SYSTEM_MESSAGE,
+        {"role": "user", "content": _ingredient_row({**base_info, "inci_name": inci_name})},
+    ]
+
+
+def _cached_ingredient_summary(key: str) -> Optional[str]:
+    _refresh_ingredient_cache_file()
+    entry = _ingredient_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, summary = entry
+    if time.monotonic() - stored_at >= INGREDIENT_CACHE_TTL_SECONDS:
+        del _ingredient_cache[key]
+        return None
+    _ingredient_cache.move_to_end(key)
+    return summary
+
+
+def _store_ingredient_summary(key: str, summary: str, stored_at: Optional[float] = None) -> None:
+    _ingredient_cache[key] = (time.monotonic() if stored_at is None else stored_at, summary)
+    _ingredient_cache.move_to_end(key)
+    while len(_ingredient_cache) > INGREDIENT_CACHE_MAX_ENTRIES:
+        _ingredient_cache.popitem(last=False)
+
+
+def load_ingredient_cache(path: str = INGREDIENT_CACHE_FILE) -> int:
+    """Merge summaries from a file written by scripts.warm_cache into the ingredient cache.
+
+    An unreadable file or malformed entries are skipped and simply stay cache misses.
+    """
     try:
-        response = await client.chat.completions.create(
-            model=MODEL_NAME,
-            response_format={"type": "json_object"},
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a cosmetics ingredient assistant. You provide concise, neutral, and non-medical summaries of "
-                        "ingredient risks. Do not give medical advice."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        "Summarize this ingredient for general skin safety."
-                        " Return JSON with a 'summary' field only.\n"
-                        f"INCI: {inci_name}\n"
-                        f"Function: {base_info.get('function', 'unknown')}\n"
-                        f"Origin: {base_info.get('origin')}\n"
-                        f"Risk level: {base_info.get('risk_level', 'unknown')}\n"
-                        f"Concerns: {concerns_text}\n"
-                        "Keep it short and neutral."
-                    ),
-                },
-            ],
+        with open(path, "rb") as cache_file:
+            entries = orjson.loads(cache_file.read())
+    except (OSError, orjson.JSONDecodeError):
+        return 0
+    if not isinstance(entries, dict):
+        return 0
+
+    loaded = 0
+    now_wall, now_monotonic = time.time(), time.monotonic()
+    for key, entry in entries.items():
+        try:
+            stored_at = now_monotonic - (now_wall - float(entry["stored_at"]))
+            summary = str(entry["summary"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        current = _ingredient_cache.get(key)
+        if now_monotonic - stored_at < INGREDIENT_CACHE_TTL_SECONDS and (current is None or current[0] < stored_at):
+            _store_ingredient_summary(key, summary, stored_at=stored_at)
+            loaded += 1
+    return loaded
+
+
+def _refresh_ingredient_cache_file() -> None:
+    """Reload the warm-up file when it changes, checking at most once per INGREDIENT_CACHE_FILE_CHECK_SECONDS."""
+    global _cache_file_checked_at, _cache_file_mtime
+    now = time.monotonic()
+    if now - _cache_file_checked_at < INGREDIENT_CACHE_FILE_CHECK_SECONDS:
+        return
+    _cache_file_checked_at = now
+    try:
+        mtime = os.stat(INGREDIENT_CACHE_FILE).st_mtime
+    except OSError:
+        return
+    if mtime != _cache_file_mtime:
+        _cache_file_mtime = mtime
+        load_ingredient_cache()
+
+
+async def summarize_ingredient(inci_name: str, base_info: Mapping[str, object]) -> str:
+    """Return the AI summary for an ingredient, served from an in-process TTL cache when warm."""
+    key = inci_name.strip().upper()
+    cached = _cached_ingredient_summary(key)
+    if cached is not None:
+        return cached
+
+    lock = _ingredient_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        cached = _cached_ingredient_summary(key)
+        if cached is not None:
+            return cached
+        summary = await _request_ingredient_summary(inci_name=inci_name, base_info=base_info)
+        _store_ingredient_summary(key, summary)
+        return summary
+
+
+async def _request_ingredient_summary(inci_name: str, base_info: Mapping[str, object]) -> str:
+    _require_client()
+    try:
+        content = await _stream_completion(
+            messages=ingredient_summary_messages(inci_name, base_info),
             temperature=0.2,
+            max_tokens=INGREDIENT_SUMMARY_MAX_TOKENS,
         )
     except Exception as exc:  # pragma: no cover - external call
         raise HTTPException(status_code=502, detail="OpenAI ingredient summary failed.") from exc
 
-    content = response.choices[0].message.content
     if not content:
         raise HTTPException(status_code=500, detail="Empty response from OpenAI.")
 
     try:
-        parsed = json.loads(content)
+        parsed = orjson.loads(content)
         return str(parsed.get("summary", "No summary provided."))
-    except json.JSONDecodeError as exc:
+    except orjson.JSONDecodeError as exc:
         raise HTTPException(status_code=500, detail="Failed to parse OpenAI ingredient summary.") from exc
 
 
-async def summarize_product(product_name: str, ingredients: List[Dict[str, object]]) -> Dict[str, str]:
+async def summarize_product(product_name: str, base_infos: List[Mapping[str, object]]) -> Dict[str, str]:
     _require_client()
-    ingredient_list = ", ".join(item.get("inciName", "") for item in ingredients)
+    ingredient_list = ", ".join(str(base_info.get("inci_name", "")) for base_info in base_infos)
     try:
-        response = await client.chat.completions.create(
-            model=MODEL_NAME,
-            response_format={"type": "json_object"},
+        content = await _stream_completion(
             messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are assessing cosmetics for general skin suitability. Provide conservative, neutral summaries and "
-                        "do not offer medical or dermatological advice."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        "Given this product and its ingredients, return JSON with fields overallScore (A/B/C/D) and "
-                        "overallSummary (1-2 sentences).\n"
-                        f"Product: {product_name}\n"
-                        f"Ingredients: {ingredient_list}"
-                    ),
-                },
+                _PRODUCT_SYSTEM_MESSAGE,
+                {"role": "user", "content": f"{product_name}\n{ingredient_list}"},
             ],
             temperature=0.3,
+            max_tokens=PRODUCT_SUMMARY_MAX_TOKENS,
         )
     except Exception as exc:  # pragma: no cover - external call
         raise HTTPException(status_code=502, detail="OpenAI product summary failed.") from exc
 
-    content = response.choices[0].message.content
     if not content:
         raise HTTPException(status_code=500, detail="Empty response from OpenAI.")
 
     try:
-        parsed = json.loads(content)
+        parsed = orjson.loads(content)
         return {
             "overallScore": str(parsed.get("overallScore", "B")),
             "overallSummary": str(
@@ -132,8 +250,96 @@ async def summarize_product(product_name: str, ingredients: List[Dict[str, objec
                 )
             ),
         }
-    except json.JSONDecodeError as exc:
+    except orjson.JSONDecodeError as exc:
         raise HTTPException(status_code=500, detail="Failed to parse OpenAI product summary.") from exc
+
+
+async def summarize_product_full(product_name: str, base_infos: List[Mapping[str, object]]) -> Dict[str, object]:
+    """Summarize every ingredient and score the product in a single completion.
+
+    Summaries already in the ingredient cache are reused and their rows are not sent;
+    the summaries returned for the remaining ingredients are written back to the cache.
+    """
+    _require_client()
+    summaries: Dict[str, str] = {}
+    uncached: List[Mapping[str, object]] = []
+    for base_info in base_infos:
+        key = str(base_info.get("inci_name", "")).strip().upper()
+        cached = _cached_ingredient_summary(key)
+        if cached is None:
+            uncached.append(base_info)
+        else:
+            summaries[key] = cached
+
+    if not uncached:
+        overall = await summarize_product(product_name=product_name, base_infos=base_infos)
+        return {**overall, "summaries": summaries}
+
+    user_prompt = f"{product_name}\n" + "\n".join(_ingredient_row(base_info) for base_info in uncached)
+    if summaries:
+        user_prompt += "\nScore only: " + ", ".join(summaries)
+
+    try:
+        content = await _stream_completion(
+            messages=[
+                _PRODUCT_FULL_SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt},
+            ],
+            temperature=0.2,
+            max_tokens=PRODUCT_SUMMARY_MAX_TOKENS + INGREDIENT_SUMMARY_MAX_TOKENS * len(uncached),
+        )
+    except Exception as exc:  # pragma: no cover - external call
+        raise HTTPException(status_code=502, detail="OpenAI product analysis failed.") from exc
+
+    if not content:
+        raise HTTPException(status_code=500, detail="Empty response from OpenAI.")
+
+    try:
+        parsed = orjson.loads(content)
+    except orjson.JSONDecodeError as exc:
+        raise HTTPException(status_code=500, detail="Failed to parse OpenAI product analysis.") from exc
+
+    requested = {str(base_info.get("inci_name", "")).strip().upper() for base_info in uncached}
+    for item in parsed.get("ingredients", []):
+        if isinstance(item, dict) and item.get("inciName"):
+            key = str(item["inciName"]).strip().upper()
+            if key in requested:
+                summaries[key] = str(item.get("summary", "No summary provided."))
+                _store_ingredient_summary(key, summaries[key])
+
+    return {
+        "summaries": summaries,
+        "overallScore": str(parsed.get("overallScore", "B")),
+        "overallSummary": str(
+            parsed.get(
+                "overallSummary",
+                "General cosmetic profile with no specific medical claims.",
+            )
+        ),
+    }
+
+
+async def analyze_ingredients_with_openai(ingredients_text: str, product_name: str) -> Dict[str, Any]:
+    _require_client()
+
+    system_prompt = (
+        "You are a food safety assistant. Given ingredient text, break it into individual ingredients, "
+        "assess risk (low/medium/high) for common allergies and health concerns, and return a concise JSON response."
+    )
+
+    user_prompt = (
+        "Analyze the following ingredients and respond strictly as JSON.\n"
+        f"Product name: {product_name}\n"
+        f"Ingredients: {ingredients_text}\n"
+        "Return fields: productName (string), ingredients (array of objects with name, risk (low|medium|high), details), "
+        "and overallScore (single letter like A/B/C/D)."
+    )
+
+    try:
+        response = await client.chat.completions.create(
+            model=FOOD_MODEL_NAME,
+            response_format={"type": "json_object"},
+            messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
@@ -147,8 +353,8 @@ async def summarize_product(product_name: str, ingredients: List[Dict[str, objec
         raise HTTPException(status_code=500, detail="Empty response from OpenAI.")
 
     try:
-        parsed = json.loads(message_content)
-    except json.JSONDecodeError as exc:
+        parsed = orjson.loads(message_content)
+    except orjson.JSONDecodeError as exc:
         raise HTTPException(status_code=500, detail="Failed to parse OpenAI response.") from exc
 
     return parsed
@@ -0,0 +1,390 @@
+import asyncio
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+
+from openai_client import (
+    OPENAI_READY,
+    summarize_ingredient,
+    summarize_product,
+    summarize_product_full,
+)
+
+router = APIRouter(tags=["cosmetics"])
+
+DISCLAIMER_TEXT = (
+    "This analysis is informational only and not medical advice."
+)
+
+ANALYSIS_CACHE_TTL_SECONDS = 60 * 60
+ANALYSIS_CACHE_MAX_ENTRIES = 1024
+
+_RAW_PRODUCT_CATALOG: Dict[str, Dict[str, object]] = {
+    "4005900889089": {
+        "product_name": "Gentle Daily Moisturizer",
+        "ingredients_inci": [
+            "AQUA",
+            "GLYCERIN",
+            "CETYL ALCOHOL",
+            "PARFUM",
+            "PHENOXYETHANOL",
+        ],
+    },
+    "3606000430150": {
+        "product_name": "SPF 50 Face Sunscreen",
+        "ingredients_inci": [
+            "AQUA",
+            "C12-15 ALKYL BENZOATE",
+            "ETHYLHEXYL METHOXYCINNAMATE",
+            "TITANIUM DIOXIDE",
+            "PARFUM",
+        ],
+    },
+    "5012000000001": {
+        "product_name": "Soothing Night Cream",
+        "ingredients_inci": [
+            "AQUA",
+            "CAPRYLIC/CAPRIC TRIGLYCERIDE",
+            "NIACINAMIDE",
+            "PARFUM",
+        ],
+    },
+}
+
+_RAW_INGREDIENT_DB: Dict[str, Dict[str, object]] = {
+    "AQUA": {
+        "function": "solvent",
+        "origin": "mineral",
+        "risk_level": "low",
+        "concerns": [],
+    },
+    "GLYCERIN": {
+        "function": "humectant",
+        "origin": "plant-based",
+        "risk_level": "low",
+        "concerns": [],
+    },
+    "CETYL ALCOHOL": {
+        "function": "emollient",
+        "origin": "plant-based",
+        "risk_level": "low",
+        "concerns": ["generally well-tolerated fatty alcohol"],
+    },
+    "PARFUM": {
+        "function": "fragrance",
+        "origin": "synthetic",
+        "risk_level": "medium",
+        "concerns": ["fragrance allergens", "potential irritation"],
+    },
+    "PHENOXYETHANOL": {
+        "function": "preservative",
+        "origin": "synthetic",
+        "risk_level": "medium",
+        "concerns": ["may irritate sensitive skin at higher levels"],
+    },
+    "C12-15 ALKYL BENZOATE": {
+        "function": "emollient",
+        "origin": "synthetic",
+        "risk_level": "low",
+        "concerns": [],
+    },
+    "ETHYLHEXYL METHOXYCINNAMATE": {
+        "function": "UV filter",
+        "origin": "synthetic",
+        "risk_level": "medium",
+        "concerns": ["possible photoallergy in sensitive individuals"],
+    },
+    "TITANIUM DIOXIDE": {
+        "function": "UV filter",
+        "origin": "mineral",
+        "risk_level": "low",
+        "concerns": ["avoid inhalation of loose powders"],
+    },
+    "CAPRYLIC/CAPRIC TRIGLYCERIDE": {
+        "function": "emollient",
+        "origin": "plant-based",
+        "risk_level": "low",
+        "concerns": [],
+    },
+    "NIACINAMIDE": {
+        "function": "skin conditioning",
+        "origin": "synthetic",
+        "risk_level": "low",
+        "concerns": ["rare flushing in very high concentrations"],
+    },
+}
+
+
+def _freeze(entries: Dict[str, Dict[str, object]]) -> Mapping[str, Mapping[str, object]]:
+    return MappingProxyType(
+        {
+            key: MappingProxyType(
+                {field: tuple(value) if isinstance(value, list) else value for field, value in entry.items()}
+            )
+            for key, entry in entries.items()
+        }
+    )
+
+
+def _ingredient_record(inci_name: str, entry: Mapping[str, object]) -> Mapping[str, object]:
+    return MappingProxyType(
+        {
+            "inci_name": inci_name,
+            "function": entry.get("function", "unknown"),
+            "origin": entry.get("origin"),
+            "risk_level": entry.get("risk_level", "unknown"),
+            "concerns": tuple(entry.get("concerns", ())),
+        }
+    )
+
+
+PRODUCT_CATALOG = _freeze(_RAW_PRODUCT_CATALOG)
+INGREDIENT_DB: Mapping[str, Mapping[str, object]] = MappingProxyType(
+    {name: _ingredient_record(name, entry) for name, entry in _RAW_INGREDIENT_DB.items()}
+)
+
+_MISSING_TEMPLATE: Mapping[str, object] = MappingProxyType(
+    {
+        "function": "unknown",
+        "origin": None,
+        "risk_level": "unknown",
+        "concerns": ("Not found in knowledge base",),
+    }
+)
+
+_RISK_MAP: Mapping[str, int] = MappingProxyType({"high": 3, "medium": 2, "low": 1, "unknown": 2})
+
+
+class IngredientRisk(BaseModel):
+    inciName: str
+    function: str
+    origin: Optional[str]
+    riskLevel: str
+    concerns: List[str]
+    aiSummary: str
+
+
+class ProductAnalysisResponse(BaseModel):
+    productName: str
+    barcode: str
+    ingredients: List[IngredientRisk]
+    overallScore: str
+    overallSummary: str
+    disclaimer: str = Field(default=DISCLAIMER_TEXT)
+
+
+_analysis_cache: "OrderedDict[str, Tuple[float, ProductAnalysisResponse]]" = OrderedDict()
+_inflight: "Dict[str, asyncio.Task[Tuple[ProductAnalysisResponse, bool]]]" = {}
+
+
+@lru_cache(maxsize=512)
+def normalize_inci(name: str) -> str:
+    return name.strip().upper()
+
+
+@lru_cache(maxsize=256)
+def lookup_product_by_barcode(barcode: str) -> Optional[Mapping[str, object]]:
+    return PRODUCT_CATALOG.get(barcode)
+
+
+@lru_cache(maxsize=512)
+def lookup_ingredient(inci_name: str) -> Mapping[str, object]:
+    normalized = normalize_inci(inci_name)
+    return INGREDIENT_DB.get(normalized) or MappingProxyType({**_MISSING_TEMPLATE, "inci_name": normalized})
+
+
+def fallback_summary(base_info: Mapping[str, object]) -> str:
+    inci = base_info.get("inci_name", "Ingredient")
+    risk = base_info.get("risk_level", "unknown")
+    concerns = base_info.get("concerns", [])
+    if concerns:
+        concerns_text = "; ".join(str(item) for item in concerns)
+    else:
+        concerns_text = "No notable concerns recorded."
+    return f"{inci} is labeled {risk} risk. {concerns_text}"
+
+
+def _build_ingredient_risk(base_info: Mapping[str, object]) -> IngredientRisk:
+    return IngredientRisk.construct(
+        inciName=base_info["inci_name"],
+        function=base_info["function"],
+        origin=base_info["origin"],
+        riskLevel=str(base_info["risk_level"]).lower(),
+        concerns=[str(item) for item in base_info["concerns"]],
+        aiSummary=fallback_summary(base_info),
+    )
+
+
+_PREBUILT: Mapping[str, IngredientRisk] = MappingProxyType(
+    {name: _build_ingredient_risk(base_info) for name, base_info in INGREDIENT_DB.items()}
+)
+
+
+def _score_from_sum(risk_sum: int, count: int) -> Dict[str, str]:
+    if not count:
+        return {"overallScore": "B", "overallSummary": "No ingredients provided for scoring."}
+
+    avg_score = risk_sum / count
+    if avg_score >= 2.5:
+        score = "C"
+        summary = "Contains ingredients that may warrant caution for sensitive skin."
+    elif avg_score >= 1.8:
+        score = "B"
+        summary = "Generally moderate profile with some potential irritants."
+    else:
+        score = "A"
+        summary = "Low-risk profile based on known ingredients."
+
+    return {"overallScore": score, "overallSummary": summary}
+
+
+async def summarize_individually(product_name: str, base_infos: List[Mapping[str, object]]) -> Dict[str, object]:
+    """Fan out per-ingredient summaries and the product score as concurrent requests.
+
+    Failed requests are left out of the result so the caller can fall back to the
+    static summaries and the offline score.
+    """
+    results = await asyncio.gather(
+        summarize_product(product_name=product_name, base_infos=base_infos),
+        *(
+            summarize_ingredient(inci_name=base_info["inci_name"], base_info=base_info)
+            for base_info in base_infos
+        ),
+        return_exceptions=True,
+    )
+    overall, ingredient_summaries = results[0], results[1:]
+
+    summaries: Dict[str, str] = {}
+    for base_info, summary in zip(base_infos, ingredient_summaries):
+        if not isinstance(summary, BaseException):
+            summaries[base_info["inci_name"]] = summary
+
+    if isinstance(overall, BaseException):
+        return {"summaries": summaries}
+    return {**overall, "summaries": summaries}
+
+
+def _cached_analysis(barcode: str) -> Optional[Tuple[ProductAnalysisResponse, int]]:
+    """Return a cached analysis together with the seconds it has left to live."""
+    entry = _analysis_cache.get(barcode)
+    if entry is None:
+        return None
+    stored_at, analysis = entry
+    remaining = ANALYSIS_CACHE_TTL_SECONDS - (time.monotonic() - stored_at)
+    if remaining <= 0:
+        del _analysis_cache[barcode]
+        return None
+    _analysis_cache.move_to_end(barcode)
+    return analysis, int(remaining)
+
+
+def _store_analysis(barcode: str, analysis: ProductAnalysisResponse) -> None:
+    _analysis_cache[barcode] = (time.monotonic(), analysis)
+    _analysis_cache.move_to_end(barcode)
+    while len(_analysis_cache) > ANALYSIS_CACHE_MAX_ENTRIES:
+        _analysis_cache.popitem(last=False)
+
+
+@router.get("/cosmetics/analyze", response_model=ProductAnalysisResponse)
+async def analyze_cosmetic(response: Response, barcode: str = Query(..., description="Barcode to look up")):
+    cached = _cached_analysis(barcode)
+    if cached is not None:
+        analysis, max_age = cached
+    else:
+        analysis, complete = await _analyze_single_flight(barcode)
+        max_age = ANALYSIS_CACHE_TTL_SECONDS if complete else 0
+    response.headers["Cache-Control"] = f"public, max-age={max_age}" if max_age > 0 else "no-store"
+    return analysis
+
+
+async def _analyze_single_flight(barcode: str) -> Tuple[ProductAnalysisResponse, bool]:
+    """Run one analysis per barcode at a time; concurrent callers await the same result.
+
+    The work runs in a detached task so that a cancelled caller, including the one that
+    started it, does not cancel the analysis for everybody else.
+    """
+    task = _inflight.get(barcode)
+    if task is None:
+        task = asyncio.create_task(_run_analysis(barcode))
+        _inflight[barcode] = task
+        task.add_done_callback(lambda done: _finish_analysis(barcode, done))
+    return await asyncio.shield(task)
+
+
+async def _run_analysis(barcode: str) -> Tuple[ProductAnalysisResponse, bool]:
+    analysis, complete = await build_cosmetic_analysis(barcode)
+    if complete:
+        _store_analysis(barcode, analysis)
+    return analysis, complete
+
+
+def _finish_analysis(barcode: str, task: "asyncio.Task[Tuple[ProductAnalysisResponse, bool]]") -> None:
+    if _inflight.get(barcode) is task:
+        del _inflight[barcode]
+    if not task.cancelled():
+        # Mark the exception as retrieved so a failure whose callers all left is not logged.
+        task.exception()
+
+
+async def build_cosmetic_analysis(barcode: str) -> Tuple[ProductAnalysisResponse, bool]:
+    """Analyze a catalog product.
+
+    The flag is False when OpenAI is configured but part of the answer fell back to the
+    offline summaries or score, so the result should not be cached.
+    """
+    product = lookup_product_by_barcode(barcode)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found in cosmetics catalog.")
+
+    product_name = str(product.get("product_name", "Unknown product"))
+    base_infos = [lookup_ingredient(inci) for inci in product.get("ingredients_inci", [])]
+    ai_summaries: Dict[str, str] = {}
+    overall: Optional[Dict[str, object]] = None
+    complete = True
+
+    if OPENAI_READY:
+        try:
+            overall = await summarize_product_full(product_name=product_name, base_infos=base_infos)
+        except HTTPException as exc:
+            # Only a malformed or truncated reply is worth retrying piecewise; upstream
+            # failures (502) would just double the traffic against a failing service.
+            if exc.status_code != 500:
+                raise
+            overall = await summarize_individually(product_name=product_name, base_infos=base_infos)
+        ai_summaries = overall["summaries"]
+
+    ingredients: List[IngredientRisk] = []
+    risk_sum = 0
+    for base_info in base_infos:
+        ingredient = _PREBUILT.get(base_info["inci_name"]) or _build_ingredient_risk(base_info)
+        risk_sum += _RISK_MAP.get(ingredient.riskLevel, 2)
+        ai_summary = ai_summaries.get(ingredient.inciName)
+        if ai_summary:
+            ingredient = ingredient.copy(update={"aiSummary": ai_summary})
+        elif OPENAI_READY:
+            complete = False
+        ingredients.append(ingredient)
+
+    if overall is not None and "overallScore" in overall:
+        overall_score = str(overall.get("overallScore", "B"))
+        overall_summary = str(overall.get("overallSummary", "Moderate risk profile."))
+    else:
+        complete = complete and not OPENAI_READY
+        fallback = _score_from_sum(risk_sum, len(ingredients))
+        overall_score = fallback["overallScore"]
+        overall_summary = fallback["overallSummary"]
+
+    analysis = ProductAnalysisResponse(
+        productName=product_name,
+        barcode=barcode,
+        ingredients=ingredients,
+        overallScore=overall_score,
+        overallSummary=overall_summary,
+        disclaimer=DISCLAIMER_TEXT,
+    )
+    return analysis, complete
@@ -0,0 +1,94 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from openai_client import analyze_ingredients_with_openai
+
+OPEN_FOOD_FACTS_URL = "https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
+OFF_CACHE_TTL_SECONDS = float(os.getenv("OFF_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+OFF_CACHE_MAX_ENTRIES = 1024
+
+# barcode -> (stored_at, etag, payload)
+_off_cache: "OrderedDict[str, Tuple[float, Optional[str], Dict[str, Any]]]" = OrderedDict()
+
+router = APIRouter(tags=["food"])
+
+
+class Ingredient(BaseModel):
+    name: str
+    risk: str
+    details: str
+
+
+class ProductAnalysis(BaseModel):
+    productName: str
+    ingredients: List[Ingredient]
+    overallScore: str
+
+
+def _store_off_response(barcode: str, etag: Optional[str], payload: Dict[str, Any]) -> None:
+    _off_cache[barcode] = (time.monotonic(), etag, payload)
+    _off_cache.move_to_end(barcode)
+    while len(_off_cache) > OFF_CACHE_MAX_ENTRIES:
+        _off_cache.popitem(last=False)
+
+
+async def fetch_product_from_open_food_facts(request: Request, barcode: str) -> dict:
+    cached = _off_cache.get(barcode)
+    if cached is not None and time.monotonic() - cached[0] < OFF_CACHE_TTL_SECONDS:
+        _off_cache.move_to_end(barcode)
+        return cached[2]
+
+    headers = {}
+    if cached is not None and cached[1]:
+        headers["If-None-Match"] = cached[1]
+
+    url = OPEN_FOOD_FACTS_URL.format(barcode=barcode)
+    response = await request.app.state.http.get(url, headers=headers)
+    if response.status_code == 304 and cached is not None:
+        _store_off_response(barcode, cached[1], cached[2])
+        return cached[2]
+    if response.status_code != 200:
+        raise HTTPException(status_code=502, detail="Failed to reach Open Food Facts.")
+
+    payload = response.json()
+    if payload.get("status") == 1:
+        _store_off_response(barcode, response.headers.get("ETag"), payload)
+    return payload
+
+
+@router.get("/analyze", response_model=ProductAnalysis)
+async def analyze(request: Request, barcode: str = Query(..., description="Barcode to look up")):
+    product_response = await fetch_product_from_open_food_facts(request, barcode)
+
+    if product_response.get("status") != 1:
+        raise HTTPException(status_code=404, detail="Product not found in Open Food Facts.")
+
+    product = product_response.get("product", {})
+    product_name = product.get("product_name") or product.get("product_name_en") or "Unknown product"
+    ingredients_text = product.get("ingredients_text") or product.get("ingredients_text_en")
+
+    if not ingredients_text:
+        return ORJSONResponse(
+            status_code=200,
+            content={
+                "productName": product_name,
+                "ingredients": [],
+                "overallScore": "N/A",
+                "message": "Ingredients not available for this product.",
+            },
+        )
+
+    try:
+        analysis = await analyze_ingredients_with_openai(ingredients_text=ingredients_text, product_name=product_name)
+    except HTTPException:
+        raise
+    except Exception as exc:  # pragma: no cover - defensive
+        raise HTTPException(status_code=500, detail="Failed to analyze ingredients.") from exc
+
+    return analysis
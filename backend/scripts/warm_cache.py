@@ -0,0 +1,108 @@
+"""Warm the ingredient summary cache through the OpenAI Batch API.
+
+Run from the backend directory on deploy or nightly:
+
+    python -m scripts.warm_cache
+
+The results atomically replace INGREDIENT_CACHE_FILE. Running servers notice the new
+file within INGREDIENT_CACHE_FILE_CHECK_SECONDS and merge it into their ingredient cache.
+"""
+import asyncio
+import os
+import tempfile
+import time
+from typing import Dict
+
+import orjson
+
+from openai_client import (
+    INGREDIENT_CACHE_FILE,
+    INGREDIENT_SUMMARY_MAX_TOKENS,
+    MODEL_NAME,
+    client,
+    ingredient_summary_messages,
+    token_limit_params,
+)
+from routers.cosmetics import INGREDIENT_DB
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+POLL_INTERVAL_SECONDS = 30
+
+
+def build_batch_input() -> bytes:
+    lines = []
+    for inci_name, base_info in INGREDIENT_DB.items():
+        lines.append(
+            orjson.dumps(
+                {
+                    "custom_id": inci_name,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": {
+                        "model": MODEL_NAME,
+                        "response_format": {"type": "json_object"},
+                        "messages": ingredient_summary_messages(inci_name, base_info),
+                        "temperature": 0.2,
+                        **token_limit_params(INGREDIENT_SUMMARY_MAX_TOKENS),
+                    },
+                }
+            )
+        )
+    return b"\n".join(lines)
+
+
+async def run_batch() -> Dict[str, Dict[str, object]]:
+    batch_file = await client.files.create(file=("ingredients.jsonl", build_batch_input()), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+    )
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        batch = await client.batches.retrieve(batch.id)
+
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch.id} finished with status {batch.status}.")
+
+    output = await client.files.content(batch.output_file_id)
+    stored_at = time.time()
+    entries: Dict[str, Dict[str, object]] = {}
+    for line in output.text.splitlines():
+        if not line:
+            continue
+        result = orjson.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        content = response["body"]["choices"][0]["message"]["content"]
+        try:
+            parsed = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            continue
+        entries[result["custom_id"]] = {
+            "stored_at": stored_at,
+            "summary": str(parsed.get("summary", "No summary provided.")),
+        }
+    return entries
+
+
+def main() -> None:
+    if client is None:
+        raise SystemExit("OPENAI_API_KEY is not configured.")
+
+    entries = asyncio.run(run_batch())
+    # Write next to the target and swap it in, so servers never read a half-written file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(INGREDIENT_CACHE_FILE) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as cache_file:
+            cache_file.write(orjson.dumps(entries))
+        os.replace(tmp_path, INGREDIENT_CACHE_FILE)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    print(f"Cached {len(entries)} ingredient summaries in {INGREDIENT_CACHE_FILE}.")
+
+
+if __name__ == "__main__":
+    main()